@@ -3,7 +3,17 @@
 # Program: Goal-based, Information Theoric, Model-based AI Agent for solving word puzzles.
 # Attribution: Dr. Cormier for make_word_list, check_letters, get_wrong_letters, is_consistent methods.
 
+import hashlib
 import math
+import os
+from functools import lru_cache
+
+import numpy as np
+
+try:
+    from numba_kernel import build_patterns
+except ImportError:
+    build_patterns = None # Numba isn't installed; replaced by build_patterns_parallel below
 
 # Function: make_word_list
 # Parameters:
@@ -11,34 +21,55 @@ import math
 #   n_letters:         Number of letters in the word
 #   allow_proper_noun: Boolean; allow proper nouns in the word list (default F)
 # Returns:
-#   wordlist: A list of words meeting the specified criteria
+#   wordlist: A tuple of words meeting the specified criteria
+#   codes:    Read-only (N, n_letters) uint8 array of letter codes (0 for 'a' .. 25 for 'z'),
+#             row i holding wordlist[i]
 # Purpose:
 #   Generates a word list from a dictionary file. The file should be a newline
 #   separated list of words. Proper nouns, if any, should include one or more
 #   upper-case letters; common nouns should be entirely in lower case.
+#   Results are cached per (file, n_letters, allow_proper_noun), so both return
+#   values are immutable: they are shared by every caller.
 
+@lru_cache(maxsize=8)
 def make_word_list(wordlist_fname, n_letters, allow_proper_noun=True):
-    # Initialization
-    wordlist = [] # Initialize to an empty list
-    # Open the file containing the list of words
-    wordlist_file = open(wordlist_fname, "r")
-    # Loop through the lines (words) in the list
-    word = wordlist_file.readline()
-    while(len(word) > 0):
-        # Remove leading and trailing whitespace, if any
-        word = word.strip()
-        if((len(word) == n_letters) and word.isalpha()):
-            if(allow_proper_noun or word.islower()):
-                wordlist.append(word)
-        # Read next word
-        word = wordlist_file.readline()
-    # Return the complete word list
-    return wordlist
+    # Read the whole file (one word per line) in a single call and split it into lines
+    with open(wordlist_fname, "rb") as wordlist_file:
+        lines = wordlist_file.read().split(b"\n")
+    # Keep the words of the right length, removing leading and trailing whitespace, if any.
+    # bytes.isalpha only accepts ASCII letters, so every kept word maps onto a letter code.
+    words = [word for word in map(bytes.strip, lines)
+             if len(word) == n_letters and word.isalpha() and (allow_proper_noun or word.islower())]
+    # The game compares letters case-insensitively, so words differing only in case (e.g. "Algol" and
+    # "algol") are the same answer; keep the first spelling of each
+    unique_words = {}
+    for word in words:
+        unique_words.setdefault(word.lower(), word)
+    words = list(unique_words.values())
+    wordlist = tuple(word.decode("ascii") for word in words)
+    # Pack the already-filtered bytes straight into letter codes
+    codes = np.frombuffer(b"".join(words).lower(), dtype=np.uint8).reshape(-1, n_letters) - ord("a")
+    codes.flags.writeable = False
+    # Return the complete word list alongside its packed letter codes
+    return wordlist, codes
+
+# Function: encode_words
+# Parameters:
+#   wordlist:  List of words, all of length n_letters
+#   n_letters: Number of letters in each word
+# Returns:
+#   (N, n_letters) uint8 array of letter codes, 0 for 'a' through 25 for 'z'
+# Purpose:
+#   Packs the word list into one contiguous block of bytes so the solver can
+#   scan it with array operations instead of per-character Python indexing.
+def encode_words(wordlist, n_letters):
+    packed = "".join(wordlist).lower().encode("ascii")
+    return np.frombuffer(packed, dtype=np.uint8).reshape(-1, n_letters) - ord("a")
 
 # Function: check_letters
 # Parameters:
-#   solution: Solution to the puzzle (lower-case)
-#   guess:    Current guess for the solution (lower-case)
+#   solution: Solution to the puzzle
+#   guess:    Current guess for the solution
 # Returns:
 #   Guess string modified to indicate correct and incorrect letters
 # Purpose:
@@ -48,16 +79,20 @@ def make_word_list(wordlist_fname, n_letters, allow_proper_noun=True):
 #     --Correct letters are in upper-case
 #     --Letters in the wrong position are in lower-case
 #     --Letters that do not appear in the solution are replaced with "_"
+#   Letters are compared case-insensitively, so proper nouns (e.g. "Mecca")
+#   get the same feedback as their lower-case spelling.
 def check_letters(solution, guess):
-    result = ""
+    solution = solution.lower()
+    guess = guess.lower()
+    result = [None] * len(solution) # Built as a list and joined once, rather than by repeated concatenation
     for i in range(len(solution)):
         if guess[i] == solution[i]:
-            result = result + guess[i].upper()
+            result[i] = guess[i].upper()
         elif guess[i] in solution:
-            result = result + guess[i]
+            result[i] = guess[i]
         else:
-            result = result + "_"
-    return result
+            result[i] = "_"
+    return "".join(result)
 
 # Function: get_wrong_letters
 # Parameters:
@@ -93,107 +128,317 @@ def is_consistent(word, clue, wrongletters):
         i = i + 1
     return test
 
+# Function: letter_counts
+# Parameters:
+#   W: (N, n_letters) uint8 array of letter codes
+# Returns:
+#   (N, 26) uint8 array; entry [i, c] is how many times letter c occurs in word i
+def letter_counts(W):
+    counts = np.zeros((len(W), 26), dtype=np.uint8)
+    np.add.at(counts, (np.arange(len(W))[:, None], W), 1)
+    return counts
+
+# Function: guess_patterns
+# Parameters:
+#   guess:  (n_letters,) uint8 letter codes of the guess
+#   W:      (N, n_letters) uint8 letter codes of the candidate solutions
+#   counts: Optional letter_counts(W), to avoid recomputing it for every guess
+# Returns:
+#   (N,) integer array of pattern IDs
+# Purpose:
+#   Computes check_letters(word, guess) for every word in W at once, encoded as
+#   a base-3 number with one digit per position: 2 for a correct letter
+#   (upper-case in the clue), 1 for a letter in the wrong position (lower-case)
+#   and 0 for a letter not in the word ("_").
+def guess_patterns(guess, W, counts=None):
+    if counts is None:
+        counts = letter_counts(W)
+    green = W == guess
+    yellow = ~green & (counts[:, guess] > 0)
+    return (green * 2 + yellow) @ 3 ** np.arange(W.shape[1])
+
+# Function: clue_pattern_id
+# Parameters:
+#   clue: Clue string as returned by check_letters
+# Returns:
+#   The pattern ID of the clue, in the same encoding as guess_patterns
+def clue_pattern_id(clue):
+    pattern = 0
+    for k in range(len(clue)):
+        if clue[k].isupper():
+            pattern += 2 * 3 ** k
+        elif clue[k] != "_":
+            pattern += 3 ** k
+    return pattern
+
+# Function: pattern_dtype
+# Parameters:
+#   n_letters: Number of letters in the word
+# Returns:
+#   The smallest unsigned integer dtype holding every pattern ID, 0 through
+#   3**n_letters - 1: uint8 for up to 5 letters, uint16 for up to 10
+# Purpose:
+#   Pattern matrices are N x N, so keeping their elements narrow keeps them
+#   cache-resident (N^2 bytes rather than 2N^2 or 8N^2 for 5-letter words).
+def pattern_dtype(n_letters):
+    return np.min_scalar_type(3 ** n_letters - 1)
+
+# Function: build_pattern_matrix
+# Parameters:
+#   W:       (N, n_letters) uint8 array of letter codes
+#   guesses: Optional (M, n_letters) letter codes of the guesses (default W)
+# Returns:
+#   (M, N) array P, of pattern_dtype(n_letters), where P[i, j] is the pattern ID of guessing word i
+#   when word j is the solution, i.e. row i is guess_patterns(guesses[i], W)
+# Purpose:
+#   Scores every guess against every word in one vectorized pass, one
+#   letter position at a time so that temporaries stay (M, N).
+def build_pattern_matrix(W, guesses=None):
+    if guesses is None:
+        guesses = W
+    counts = letter_counts(W)
+    dtype = pattern_dtype(W.shape[1])
+    P = np.zeros((len(guesses), len(W)), dtype=dtype)
+    for k in range(W.shape[1]):
+        green = guesses[:, None, k] == W[None, :, k]
+        present = counts[:, guesses[:, k]].T > 0
+        P += np.where(green, 2, present).astype(dtype) * dtype.type(3 ** k)
+    return P
+
+# Function: build_patterns_parallel
+# Parameters:
+#   W:      (N, n_letters) uint8 array of letter codes
+#   out:    Preallocated (N, N) array of pattern_dtype(n_letters) receiving the pattern IDs
+#   n_jobs: Number of joblib worker processes (-1 for one per core)
+# Returns:
+#   out, filled the same way as numba_kernel.build_patterns
+# Purpose:
+#   Fallback for build_patterns when Numba isn't installed. The rows of the
+#   matrix (one per guess) are independent, so blocks of them are built with
+#   build_pattern_matrix in separate processes and copied into out.
+def build_patterns_parallel(W, out, n_jobs=-1):
+    from joblib import Parallel, delayed, effective_n_jobs
 
+    row_blocks = np.array_split(np.arange(len(W)), max(1, min(len(W), 4 * effective_n_jobs(n_jobs))))
+    blocks = Parallel(n_jobs=n_jobs)(delayed(build_pattern_matrix)(W, W[rows]) for rows in row_blocks)
+    for rows, block in zip(row_blocks, blocks):
+        out[rows] = block
+    return out
 
+if build_patterns is None:
+    build_patterns = build_patterns_parallel
 
+# Lookup table of log2(n) for bucket sizes n, grown on demand by log2_table
+LOG2 = np.zeros(1, dtype=np.float32)
 
-def word_ig_solver(X, solution, n_guesses):
+# Function: log2_table
+# Parameters:
+#   n: Largest value that will be looked up
+# Returns:
+#   float32 array whose entry [k] is log2(k) for 1 <= k <= n, and 0 for k = 0
+# Purpose:
+#   Subset sizes are small integers, so their logarithms are looked up rather
+#   than recomputed for every bucket of every candidate. Entry 0 is 0 so that
+#   empty buckets drop out of n * log2(n) sums without masking.
+def log2_table(n):
+    global LOG2
+    if len(LOG2) <= n:
+        LOG2 = np.log2(np.maximum(np.arange(n + 1), 1)).astype(np.float32)
+    return LOG2
+
+# Number of matrix elements pattern_entropies histograms at once
+ENTROPY_BLOCK_SIZE = 1 << 18
+
+# Function: pattern_entropies
+# Parameters:
+#   P: (M, N) array of pattern IDs, one row per candidate guess and one column
+#      per possible solution
+# Returns:
+#   (M,) array holding the information gain of each candidate guess
+# Purpose:
+#   Vectorized simulate_guess_patterns over every row of P: the patterns of all
+#   rows are histogrammed with a single bincount by offsetting each row into
+#   its own block of bins.
+def pattern_entropies(P):
+    M, N = P.shape
+    log2 = log2_table(N)
+    weighted_subset_entropy = np.zeros(M, dtype=np.float32)
+    if M == 0 or N == 0:
+        return weighted_subset_entropy
+    n_patterns = int(P.max()) + 1
+    # Histogram a block of rows at a time so the offset IDs and bucket counts stay a few MB,
+    # rather than promoting all of the (narrow) P to int64
+    rows_per_block = max(1, ENTROPY_BLOCK_SIZE // max(N, n_patterns))
+    for start in range(0, M, rows_per_block):
+        block = P[start:start + rows_per_block]
+        offsets = np.arange(len(block), dtype=np.int32)[:, None] * np.int32(n_patterns)
+        subset_sizes = np.bincount((block + offsets).ravel(), minlength=len(block) * n_patterns).reshape(len(block), n_patterns)
+        # A uniform subset of size n has entropy log2(n); empty subsets contribute nothing
+        weighted_subset_entropy[start:start + len(block)] = (log2[subset_sizes] * subset_sizes.astype(np.float32)).sum(axis=1)
+    return information_gain(log2[N], weighted_subset_entropy / np.float32(N))
+
+# Function: top_guesses
+# Parameters:
+#   entropies: (M,) array of information gains, as returned by pattern_entropies
+#   k:         Number of candidates to return
+# Returns:
+#   Indices of the k highest-scoring candidates, best first
+# Purpose:
+#   Partitions out the top k in linear time and only sorts those k, instead of
+#   sorting every candidate.
+def top_guesses(entropies, k=5):
+    if k >= len(entropies):
+        return np.argsort(-entropies, kind="stable")
+    top = np.argpartition(entropies, -k)[-k:]
+    return top[np.argsort(-entropies[top], kind="stable")]
+
+# Directory where best_opening_guess persists its results between runs
+OPENER_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "aivswords")
+# In-memory cache of best_opening_guess, keyed by the word list's hash
+opening_guesses = {}
+
+# Function: opener_cache_key
+# Parameters:
+#   X: The full word list
+# Returns:
+#   (digest, cache_fname): hash of the sorted word list, used as the in-memory
+#   key, and the file best_opening_guess stores that word list's opener in
+def opener_cache_key(X):
+    digest = hashlib.sha1("\n".join(sorted(X)).encode("ascii")).hexdigest()
+    return digest, os.path.join(OPENER_CACHE_DIR, f"opener_{digest}.txt")
+
+# Function: cached_opening_guess
+# Parameters:
+#   X: The full word list, before any guess
+# Returns:
+#   The opener best_opening_guess previously found for X, or None if it has
+#   not been computed yet (or its cache file is unreadable or invalid)
+def cached_opening_guess(X):
+    digest, cache_fname = opener_cache_key(X)
+    if digest in opening_guesses:
+        return opening_guesses[digest]
+    try:
+        with open(cache_fname, "r", encoding="ascii") as cache_file:
+            guess = cache_file.read().strip()
+    except (OSError, UnicodeDecodeError):
+        return None # Not computed yet, or the file is unreadable or corrupt
+    if guess not in X:
+        return None
+    opening_guesses[digest] = guess
+    return guess
+
+# Function: best_opening_guess
+# Parameters:
+#   X: The full word list, before any guess
+#   P: Optional pattern matrix of X, as built by build_patterns (built here if omitted)
+# Returns:
+#   The word with the highest information gain against all of X
+# Purpose:
+#   The first guess depends only on the word list, not on the solution, so it
+#   is computed once and then cached both in memory and on disk, as a plain
+#   text file under ~/.cache/aivswords named after a hash of the sorted word
+#   list (a changed word list simply gets a new file).
+def best_opening_guess(X, P=None):
+    guess = cached_opening_guess(X)
+    if guess is not None:
+        return guess
+
+    if P is None:
+        codes = encode_words(X, len(X[0]))
+        P = build_patterns(codes, np.empty((len(X), len(X)), dtype=pattern_dtype(codes.shape[1])))
+    guess = X[int(pattern_entropies(P).argmax())]
+    digest, cache_fname = opener_cache_key(X)
+    opening_guesses[digest] = guess
+    try:
+        os.makedirs(OPENER_CACHE_DIR, exist_ok=True)
+        with open(cache_fname, "w", encoding="ascii") as cache_file:
+            cache_file.write(guess + "\n")
+    except OSError:
+        pass  # Caching is best-effort; a read-only home directory just means recomputing next run
+    return guess
+
+
+def word_ig_solver(X, solution, n_guesses, codes=None):
     """
     tries to solve the word game using Information Theory through Information Gain.
     :param X: set of words
+    :param codes: letter codes of X as returned by make_word_list (computed from X if omitted)
     :return: last guess made, number of guesses, sequence of guesses
     """
+    if codes is None:
+        codes = encode_words(X, len(solution))
     S = []
-    clues = []
     guesses_used = 0
-    ## Optional: Arbitrarily choosing the first guess
-    # In here, I should figure out how to choose the best initial guess, this should be the one that provides the most distinctive feedback.
-    # For now, we'll just choose arbitrarily, given that we haven't made any guess yet.
-    #best_guess = X[rand.randint(0, len(X))]
-    #S.append(best_guess)
-    #E = initialize_entropy(X)  # Optimization, O(1) calculation, assuming we start with no information, not even used
-
-    # Optimization
-#    clue = check_letters(solution, S[-1])  # Check the initial best guess
-#    clues.append(clue)
-
-
-#    if (clue == solution.upper()):
-#        return f"You won! The statistics are: Best guess: {S[-1]}, Number of guesses: {len(S)}, Guesses made: {S}"
-#    guesses_used = guesses_used + 1
-
+    idx_X = np.arange(len(X)) # Indices of the still-valid words, parallel to the rows of the codes array
+    # The best initial guess is the one that provides the most distinctive feedback over the whole word list.
+    # It doesn't depend on the solution, so after the first game it comes from best_opening_guess's cache and
+    # the full word list's pattern matrix is never built; it is only needed to find the opener the first time.
+    opening_guess = cached_opening_guess(X)
+    P = None # Pattern matrix of the still-valid words against each other, P[a, b] for words idx_X[a] and idx_X[b]
+    if opening_guess is None:
+        P = build_patterns(codes, np.empty((len(X), len(X)), dtype=pattern_dtype(codes.shape[1])))
+        opening_guess = best_opening_guess(X, P)
     while (guesses_used < n_guesses):
-        Y = []
-        print(f"Remaining guesses: {n_guesses - guesses_used}, Current solution space: {len(X)} words.")
-
-        # Find the guess that creates the most information gain subset(s)
-        max_entropy = float('-inf') # Consolidate larger primitive, float.
-        best_guess = None
-
-        for candidate in X:
-            _, entropy = simulate_guess_patterns(candidate, X)
-            if entropy > max_entropy:
-                max_entropy = entropy
-                best_guess = candidate
-
-        if best_guess is None:  # Safety check
-            print("Warning: No best guess found! Using first available word.")
-            best_guess = X[0]  # Fallback just in case
+        if len(idx_X) == 0:
+            return f"No word in the list is consistent with the clues, so the solution {solution} is not in the word list. Your guesses were: {S}"
+        print(f"Remaining guesses: {n_guesses - guesses_used}, Current solution space: {len(idx_X)} words.")
+
+        # Find the guess that creates the most information gain subset(s), scoring all candidates at once
+        if guesses_used == 0:
+            best = X.index(opening_guess)
+            patterns = P[best] if P is not None else guess_patterns(codes[best], codes)
+        else:
+            if P is None: # Only the words left after the opener are scored against each other
+                P = build_patterns(codes[idx_X], np.empty((len(idx_X), len(idx_X)), dtype=pattern_dtype(codes.shape[1])))
+            best = int(pattern_entropies(P).argmax())
+            patterns = P[best]
+        best_idx = idx_X[best]
 
-        S.append(best_guess) # Hopefully, we found a best guess, otherwise we'd have a None -- exception check here may help
+        S.append(X[best_idx])
         clue = check_letters(solution, S[-1]) # Check the latest best guess to get another clue
-        clues.append(clue) # Append the clue
         print(f"Trying guess: {S[-1]}")
 
         if (clue == solution.upper()):
             return f"You won! The statistics are: Best guess: {S[-1]}, Number of guesses: {len(S)}, Guesses made: {S}"
 
-        for word in X:
-            word_wrong_letters = get_wrong_letters(best_guess, clue)  # Use the latest clue
-            consistent_this_many_times = 0
-            for current_clue in clues:  # NOTE: can't use clue here as variable shadowing causes issues
-                if is_consistent(word, current_clue, word_wrong_letters):
-                    consistent_this_many_times = consistent_this_many_times + 1
-                    if consistent_this_many_times == len(clues):  # Fully consistent
-                        Y.append(word)
-
-        X = Y # Replace the pointer to our word list with our new subset of valid words
+        # A word is consistent with the clue exactly when it would have produced the same pattern for this guess.
+        # X is already consistent with every earlier clue, so only the latest one needs checking.
+        consistent = patterns == clue_pattern_id(clue)
+        idx_X = idx_X[consistent]
+        if P is not None:
+            P = P[np.ix_(consistent, consistent)]
         guesses_used = guesses_used + 1
 
     return f"You ran out of guesses! The solution was: {solution}. Total guesses made: {len(S)}. Your guesses were: {S}"
 
 
-def simulate_guess_patterns(guess, X):
+def simulate_guess_patterns(guess, X, counts=None):
     """
     Simulates how well a guess can distinguish between possible solutions
     by counting the different patterns it would create.
 
     Args:
-        guess: The word we're considering guessing
-        X: List of words that could be the solution
+        guess: Letter codes of the word we're considering guessing
+        X: Letter codes of the words that could be the solution, one row per word
+        counts: Optional letter_counts(X), shared across every guess scored against X
 
     Returns:
-        pattern_counts: Dictionary mapping patterns to their frequency, this may be overkill
+        pattern_counts: Array indexed by pattern ID holding how many words of X produce that pattern
         E: the entropy of the resulting subset
 
     Note: This function is primarily used to avoid using 'guesses'. It uses instead, the clues, in order to deduce the information gain of a particular word.
     """
-    pattern_counts = {}
-    E_initial = calculate_entropy(X)
-
     # See what subset (pattern) would be created by each word. The patterns that are split into even(ish) splits are the best, or as close to it as possible.
-    for word in X:
-        pattern = check_letters(word, guess)
-        if pattern not in pattern_counts:
-            pattern_counts[pattern] = []
-        pattern_counts[pattern].append(word)
-
-    # Calculate average entropy after this guess
-    weighted_subset_entropy = 0
-    for subset in pattern_counts.values():
-        prob = len(subset) / len(X) # Optimization again
-        subset_entropy = calculate_entropy(subset)
-        weighted_subset_entropy += prob * subset_entropy
+    pattern_counts = np.bincount(guess_patterns(guess, X, counts), minlength=3 ** X.shape[1])
+    if len(X) == 0:
+        return pattern_counts, 0.0 # No solutions left, so no information to gain
+
+    log2 = log2_table(len(X))
+    E_initial = log2[len(X)] # Same as calculate_entropy(X)
+
+    # Calculate average entropy after this guess. Each subset is uniform, so its entropy is log2 of its size.
+    subset_sizes = pattern_counts[pattern_counts > 0]
+    weighted_subset_entropy = (log2[subset_sizes] * subset_sizes.astype(np.float32)).sum() / np.float32(len(X))
 
     # Information gain is the difference between initial and weighted subset entropy
     information_gained = information_gain(E_initial, weighted_subset_entropy)
@@ -218,22 +463,10 @@ def calculate_entropy(X):
     Calculates the entire entropy of the input
     :param X:
     :return: returns Entropy of X
+    :note: in this word game we assume there's only one solution and no duplicate words in X, so X is uniform
+           and its entropy reduces to log2(len(X)), computed in O(1).
     """
-    E = 0
-    for x in X:
-        #p_x = probability_unit(x, X) # General case
-        p_x = 1 / len(X) # OPTIMIZATION: Because in this word game, we assume there's only one solution, and no duplicate words in our set X.
-        I = information_unit(p_x)
-        E = E + I * p_x
-    return E
-
-def initialize_entropy(X):
-    """
-    Input: A data structure X containing the relevant data points
-    Output: Initial entropy
-    """
-    E = math.log2(len(X))
-    return E
+    return math.log2(len(X)) if len(X) else 0.0
 
 def information_unit(p_x):
     """
@@ -246,23 +479,11 @@ def information_unit(p_x):
     I = - math.log2(p_x)
     return I
 
-def probability_unit(x, X):
-    """
-    Calculates the probability of an outcome x of a random variable X occuring, that is, P(X = x).
-    :param x:
-    :param X:
-    :return: P(X = x), denoted as p_x
-    """
-    samples = 0
-    for x in X:
-        samples += 1
-    return samples/len(X) # Return the probability p_x
-
 # Configure parameters
 # Puzzle parameters
 n_letters = 5
 n_guesses = 5
 # Word list parameters
 word_list_fname = "linuxwords.txt"
-word_list = make_word_list(word_list_fname, n_letters, allow_proper_noun=False)
+word_list, word_codes = make_word_list(word_list_fname, n_letters, allow_proper_noun=False)
 
@@ -0,0 +1,75 @@
+# Author: Faycal Kilali
+# Version: 0.1
+# Program: Numba-compiled kernels for the word puzzle solver's hot loops.
+
+import numpy as np
+from numba import njit, prange
+
+
+# Function: specialize_build_patterns
+# Parameters:
+#   n_letters: Word length to compile the kernel for, or 0 for any length
+# Returns:
+#   A compiled build_patterns kernel
+# Purpose:
+#   Generates the pattern-matrix kernel with the word length baked in as a
+#   compile-time constant, so LLVM can fully unroll the per-letter loops.
+def specialize_build_patterns(n_letters):
+    @njit(parallel=True, cache=True)
+    def kernel(W, out):
+        # out must be wide enough for every ID below 3**L (uint8 suffices for L <= 5);
+        # IDs are written with a plain cast, so a narrower array would silently wrap
+        N = W.shape[0]
+        L = n_letters if n_letters else W.shape[1]
+        # Which letters occur in each word, i.e. letter_counts(W) > 0
+        present = np.zeros((N, 26), dtype=np.bool_)
+        for j in prange(N):
+            for k in range(L):
+                present[j, W[j, k]] = True
+        for i in prange(N):
+            for j in range(N):
+                pattern = 0
+                weight = 1
+                for k in range(L):
+                    if W[i, k] == W[j, k]:
+                        pattern += 2 * weight
+                    elif present[j, W[i, k]]:
+                        pattern += weight
+                    weight *= 3
+                out[i, j] = pattern
+        return out
+    return kernel
+
+
+build_patterns_generic = specialize_build_patterns(0)
+build_patterns_L5 = specialize_build_patterns(5)
+build_patterns_L6 = specialize_build_patterns(6)
+SPECIALIZED_KERNELS = {5: build_patterns_L5, 6: build_patterns_L6}
+
+
+# Function: build_patterns
+# Parameters:
+#   W:   (N, n_letters) uint8 array of letter codes
+#   out: Preallocated (N, N) integer array receiving the pattern IDs, of
+#        aivswords_backend.pattern_dtype(n_letters)
+# Returns:
+#   out, filled so that out[i, j] is the pattern ID of guessing word i when
+#   word j is the solution (same encoding as aivswords_backend.guess_patterns)
+# Purpose:
+#   Compiled, multi-threaded equivalent of build_pattern_matrix. Each thread
+#   fills whole rows of out, so no (N, N, n_letters) temporaries are created.
+#   Dispatches to a kernel specialized for the word length when there is one.
+def build_patterns(W, out):
+    kernel = SPECIALIZED_KERNELS.get(W.shape[1], build_patterns_generic)
+    return kernel(W, out)
+
+
+# Compile the specialized kernels once at import so the first game doesn't pay
+# for it, for both writable and read-only (as cached by make_word_list) letter
+# codes. The generic kernel compiles on first use.
+for _n_letters, _kernel in SPECIALIZED_KERNELS.items():
+    _warmup_codes = np.zeros((1, _n_letters), dtype=np.uint8)
+    _warmup_dtype = np.min_scalar_type(3 ** _n_letters - 1) # Same as pattern_dtype(_n_letters)
+    _kernel(_warmup_codes, np.empty((1, 1), dtype=_warmup_dtype))
+    _warmup_codes.flags.writeable = False
+    _kernel(_warmup_codes, np.empty((1, 1), dtype=_warmup_dtype))
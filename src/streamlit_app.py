@@ -1,6 +1,7 @@
 # Author: Faycal Kilali
 # Version: 0.1
 
+import numpy as np
 import streamlit as st
 import pandas as pd
 import plotly.express as px
@@ -8,32 +9,66 @@ from aivswords_backend import (
     make_word_list,
     check_letters,
     calculate_entropy,
-    simulate_guess_patterns,
-    is_consistent,
-    get_wrong_letters
+    encode_words,
+    pattern_dtype,
+    build_patterns,
+    clue_pattern_id,
+    pattern_entropies,
+    top_guesses
 )
 
+# Above this many remaining words, only a random subset of them is scored as candidate guesses
+MAX_SCORED_WORDS = 5000
+CANDIDATE_SAMPLE_SIZE = 2000
+rng = np.random.default_rng()
+
+# Columns of the guess history table, one record tuple per guess
+HISTORY_COLUMNS = ('Guess', 'Clue', 'Remaining Words', 'Information Gain')
+
+
+@st.cache_data
+def load_word_list(word_list_fname, n_letters, allow_proper_noun):
+    return make_word_list(word_list_fname, n_letters, allow_proper_noun=allow_proper_noun)
+
+
+@st.cache_resource
+def get_pattern_matrix(word_list):
+    # Built once per word list and shared by every session of this Streamlit process
+    W = encode_words(word_list, len(word_list[0]))
+    P = build_patterns(W, np.empty((len(W), len(W)), dtype=pattern_dtype(W.shape[1])))
+    P.flags.writeable = False
+    return P
+
 
 def initialize_session_state():
     if 'word_list' not in st.session_state:
-        st.session_state.word_list = make_word_list("linuxwords.txt", 5, False)
-    if 'history' not in st.session_state:
-        st.session_state.history = []
-    if 'current_solution_space' not in st.session_state:
-        st.session_state.current_solution_space = st.session_state.word_list.copy()
+        st.session_state.word_list, st.session_state.codes = load_word_list("linuxwords.txt", 5, False)
+    if 'patterns' not in st.session_state:
+        st.session_state.patterns = get_pattern_matrix(st.session_state.word_list)
+    if 'history_records' not in st.session_state:
+        st.session_state.history_records = []
+    if 'idx_X' not in st.session_state:
+        st.session_state.idx_X = np.arange(len(st.session_state.word_list))
     if 'guesses_made' not in st.session_state:
         st.session_state.guesses_made = []
+    if 'top_guesses' not in st.session_state:
+        st.session_state.top_guesses = []
     if 'target_word' not in st.session_state:
         st.session_state.target_word = None
 
 
 def reset_game():
-    st.session_state.current_solution_space = st.session_state.word_list.copy()
-    st.session_state.history = []
+    st.session_state.idx_X = np.arange(len(st.session_state.word_list))
+    st.session_state.history_records = []
     st.session_state.guesses_made = []
+    st.session_state.top_guesses = []
     st.session_state.target_word = None
 
 
+def current_solution_space():
+    return [st.session_state.word_list[i] for i in st.session_state.idx_X]
+
+
 def display_header():
     st.title("Information Theory Word Solver")
     st.markdown("""
@@ -61,34 +96,38 @@ def display_game_stats():
     col1, col2, col3 = st.columns(3)
 
     with col1:
-        st.metric("Remaining Words", len(st.session_state.current_solution_space))
+        st.metric("Remaining Words", len(st.session_state.idx_X))
     with col2:
         st.metric("Guesses Made", len(st.session_state.guesses_made))
     with col3:
-        if st.session_state.current_solution_space:
-            entropy = calculate_entropy(st.session_state.current_solution_space)
+        if len(st.session_state.idx_X):
+            entropy = calculate_entropy(st.session_state.idx_X)
             st.metric("Current Entropy", f"{entropy:.2f} bits")
 
 
 def display_guess_history():
-    if st.session_state.history:
+    if st.session_state.history_records:
         st.subheader("Guess History")
-        history_df = pd.DataFrame(st.session_state.history)
+        history_df = pd.DataFrame.from_records(st.session_state.history_records, columns=HISTORY_COLUMNS)
         st.dataframe(history_df)
 
 
+def display_top_guesses():
+    if st.session_state.top_guesses:
+        st.subheader("Top Candidates for the Last Guess")
+        top_df = pd.DataFrame(st.session_state.top_guesses, columns=['Candidate', 'Information Gain'])
+        st.dataframe(top_df)
+
+
 def display_solution_space_viz():
-    if st.session_state.current_solution_space:
+    if len(st.session_state.idx_X):
         st.subheader("Solution Space Distribution")
-        # Create a simple visualization of first letters distribution
-        first_letters = pd.DataFrame(
-            [word[0] for word in st.session_state.current_solution_space],
-            columns=['First Letter']
-        )
-        letter_counts = first_letters['First Letter'].value_counts()
+        # Create a simple visualization of first letters distribution, counted straight from the letter codes
+        letter_counts = np.bincount(st.session_state.codes[st.session_state.idx_X, 0], minlength=26)
+        letters = [chr(ord('a') + i) for i in range(26) if letter_counts[i]]
         fig = px.bar(
-            x=letter_counts.index,
-            y=letter_counts.values,
+            x=letters,
+            y=letter_counts[letter_counts > 0],
             title="Distribution of First Letters in Remaining Words",
             labels={'x': 'Letter', 'y': 'Count'}
         )
@@ -96,41 +135,37 @@ def display_solution_space_viz():
 
 
 def make_guess():
-    if st.session_state.target_word and st.session_state.current_solution_space:
-        # Simulate the next best guess
-        next_guess = None
-        max_entropy = float('-inf')
-
-        # Take a sample of words for efficiency in the UI
-        sample_size = min(100, len(st.session_state.current_solution_space))
-        sample_words = st.session_state.current_solution_space[:sample_size]
-
-        for candidate in sample_words:
-            _, entropy = simulate_guess_patterns(candidate, st.session_state.current_solution_space)
-            if entropy > max_entropy:
-                max_entropy = entropy
-                next_guess = candidate
-
-        if next_guess:
-            clue = check_letters(st.session_state.target_word, next_guess)
-            st.session_state.guesses_made.append(next_guess)
-
-            # Update history
-            st.session_state.history.append({
-                'Guess': next_guess,
-                'Clue': clue,
-                'Remaining Words': len(st.session_state.current_solution_space),
-                'Information Gain': max_entropy
-            })
-
-            # Update solution space
-            new_space = [
-                word for word in st.session_state.current_solution_space
-                if is_consistent(word, clue, get_wrong_letters(next_guess, clue))
-            ]
-            st.session_state.current_solution_space = new_space
-
-            return next_guess, clue
+    if st.session_state.target_word and len(st.session_state.idx_X):
+        # Simulate the next best guess, scoring every remaining word against every other
+        idx_X = st.session_state.idx_X
+        P = st.session_state.patterns
+
+        # Only very large solution spaces are sampled, uniformly at random so no part of the alphabet is favoured
+        candidates = idx_X
+        if len(idx_X) > MAX_SCORED_WORDS:
+            candidates = np.sort(rng.choice(idx_X, size=CANDIDATE_SAMPLE_SIZE, replace=False))
+
+        entropies = pattern_entropies(P[np.ix_(candidates, idx_X)])
+        best = candidates[int(entropies.argmax())]
+        next_guess = st.session_state.word_list[best]
+        max_entropy = float(entropies.max())
+        st.session_state.top_guesses = [
+            (st.session_state.word_list[candidates[i]], float(entropies[i]))
+            for i in top_guesses(entropies, 5)
+        ]
+
+        clue = check_letters(st.session_state.target_word, next_guess)
+        st.session_state.guesses_made.append(next_guess)
+
+        # Update history
+        st.session_state.history_records.append(
+            (next_guess, clue, len(st.session_state.idx_X), max_entropy)
+        )
+
+        # Update solution space: keep the words that would have produced the same clue
+        st.session_state.idx_X = idx_X[P[best, idx_X] == clue_pattern_id(clue)]
+
+        return next_guess, clue
     return None, None
 
 
@@ -155,10 +190,11 @@ def main():
 
         display_game_stats()
         display_guess_history()
+        display_top_guesses()
         display_solution_space_viz()
 
         with st.expander("View Current Solution Space"):
-            st.write(st.session_state.current_solution_space)
+            st.write(current_solution_space())
 
     elif target_word:
         st.error("Please enter a valid 5-letter word.")
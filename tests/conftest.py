@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The modules live in src/ and aivswords_backend reads linuxwords.txt relative to the working directory at import
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src")
+sys.path.insert(0, SRC_DIR)
+os.chdir(SRC_DIR)
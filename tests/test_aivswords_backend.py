@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+import aivswords_backend as backend
+
+
+@pytest.fixture(autouse=True)
+def opener_cache_dir(tmp_path, monkeypatch):
+    # Keep best_opening_guess from writing into the real home directory, starting from an empty cache
+    monkeypatch.setattr(backend, "OPENER_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(backend, "opening_guesses", {})
+    return tmp_path
+
+
+@pytest.mark.parametrize("allow_proper_noun", [False, True])
+def test_pattern_matrix_matches_check_letters(allow_proper_noun):
+    X, codes = backend.make_word_list("linuxwords.txt", 5, allow_proper_noun=allow_proper_noun)
+    P = backend.build_patterns(codes, np.empty((len(X), len(X)), dtype=backend.pattern_dtype(5)))
+    rng = np.random.default_rng(0)
+    for i in rng.choice(len(X), size=40, replace=False):
+        expected = [backend.clue_pattern_id(backend.check_letters(X[j], X[i])) for j in range(len(X))]
+        assert P[i].tolist() == expected
+
+
+def test_solver_solves_with_proper_nouns():
+    X, codes = backend.make_word_list("linuxwords.txt", 5, allow_proper_noun=True)
+    assert backend.word_ig_solver(X, "media", 6, codes).startswith("You won!")
+
+
+def test_solver_handles_solution_missing_from_word_list():
+    X, codes = backend.make_word_list("linuxwords.txt", 5, allow_proper_noun=False)
+    assert "zzzzz" in backend.word_ig_solver(X, "zzzzz", 6, codes)
+
+
+@pytest.mark.parametrize("allow_proper_noun", [False, True])
+def test_pattern_filter_matches_is_consistent(allow_proper_noun):
+    X, codes = backend.make_word_list("linuxwords.txt", 5, allow_proper_noun=allow_proper_noun)
+    # is_consistent predates case-insensitive clues, so it is given lower-case words
+    words = [word.lower() for word in X]
+    rng = np.random.default_rng(0)
+    for guess_idx, solution_idx in rng.choice(len(X), size=(30, 2)):
+        clue = backend.check_letters(words[solution_idx], words[guess_idx])
+        wrongletters = backend.get_wrong_letters(words[guess_idx], clue)
+        expected = [j for j in range(len(X)) if backend.is_consistent(words[j], clue, wrongletters)]
+        patterns = backend.guess_patterns(codes[guess_idx], codes)
+        assert np.flatnonzero(patterns == backend.clue_pattern_id(clue)).tolist() == expected
+
+
+def test_opening_guess_recomputed_from_corrupt_cache(opener_cache_dir, monkeypatch):
+    X, codes = backend.make_word_list("linuxwords.txt", 5, allow_proper_noun=False)
+    guess = backend.best_opening_guess(X)
+    (cache_file,) = opener_cache_dir.iterdir()
+    assert cache_file.read_text().strip() == guess
+    cache_file.write_bytes(b"\x80\x04not a word")
+    monkeypatch.setattr(backend, "opening_guesses", {})
+    assert backend.best_opening_guess(X) == guess
+
+
+def test_solver_skips_full_pattern_matrix_on_cached_opener(monkeypatch):
+    X, codes = backend.make_word_list("linuxwords.txt", 5, allow_proper_noun=False)
+    first_game = backend.word_ig_solver(X, "media", 6, codes)
+    built = []
+    build_patterns = backend.build_patterns
+    def recording_build_patterns(W, out):
+        built.append(len(W))
+        return build_patterns(W, out)
+    monkeypatch.setattr(backend, "build_patterns", recording_build_patterns)
+    monkeypatch.setattr(backend, "opening_guesses", {}) # Served from the file written by the first game
+    assert backend.word_ig_solver(X, "media", 6, codes) == first_game
+    assert built and max(built) < len(X)
+
+
+@pytest.mark.parametrize("n_letters", [5, 6])
+def test_build_patterns_parallel_matches_build_patterns(n_letters):
+    X, codes = backend.make_word_list("linuxwords.txt", n_letters, allow_proper_noun=False)
+    codes = codes[:300]
+    P = backend.build_patterns(codes, np.empty((len(codes), len(codes)), dtype=backend.pattern_dtype(n_letters)))
+    np.testing.assert_array_equal(backend.build_patterns_parallel(codes, np.empty_like(P), n_jobs=2), P)
+
+
+def test_simulate_guess_patterns_on_empty_solution_space():
+    X, codes = backend.make_word_list("linuxwords.txt", 5, allow_proper_noun=False)
+    with np.errstate(all="raise"):
+        pattern_counts, information_gained = backend.simulate_guess_patterns(codes[0], codes[:0])
+    assert pattern_counts.sum() == 0
+    assert information_gained == 0
+
+
+@pytest.mark.parametrize("rows_per_block", [1, 7])
+def test_pattern_entropies_blocks_match_single_block(rows_per_block, monkeypatch):
+    X, codes = backend.make_word_list("linuxwords.txt", 5, allow_proper_noun=False)
+    codes = codes[:500]
+    N = len(codes)
+    P = backend.build_patterns(codes, np.empty((N, N), dtype=backend.pattern_dtype(5)))
+    assert N * N <= backend.ENTROPY_BLOCK_SIZE # The whole matrix fits in one block by default
+    single_block = backend.pattern_entropies(P)
+    monkeypatch.setattr(backend, "ENTROPY_BLOCK_SIZE", rows_per_block * N + 1)
+    np.testing.assert_array_equal(backend.pattern_entropies(P), single_block)